@@ -2,18 +2,31 @@
 import os
 import csv
 import io
+import re
+import time
+import hashlib
+import asyncio
+import threading
 import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from typing import Optional, List, Annotated
 
 from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from passlib.context import CryptContext
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+import bcrypt
 import jwt
+from cachetools import TTLCache
 
 from sqlalchemy import (
-    create_engine, String, Integer, Float, Date, ForeignKey, Text, select, func
+    create_engine, event, String, Integer, Float, Date, ForeignKey, Text, Index, select, func, insert, case,
+    text, literal_column, lambda_stmt,
 )
 from sqlalchemy.orm import declarative_base, Mapped, mapped_column, relationship, Session
 
@@ -21,17 +34,66 @@ from sqlalchemy.orm import declarative_base, Mapped, mapped_column, relationship
 # Config / Env
 # -----------------------
 SECRET_KEY = os.getenv("SECRET_KEY", "dev_secret_change_me")
+_SECRET_BYTES = SECRET_KEY.encode()
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "120"))
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./expensetracker.db")
+JWT_CACHE_TTL = int(os.getenv("JWT_CACHE_TTL", "5"))  # seconds; 0 disables the cache
+JWT_CACHE_MAX = int(os.getenv("JWT_CACHE_MAX", "10000"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))  # seconds; 0 disables the cache
+USER_CACHE_MAX = int(os.getenv("USER_CACHE_MAX", "5000"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))  # max in-flight password hashes
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_jwt = jwt.PyJWT(options={"verify_signature": True, "require": ["exp", "sub"]})
+JWT_ALGORITHMS = ("HS256",)
+MAX_TOKEN_LENGTH = 4096  # anything longer is rejected before hashing/decoding
+
+# argon2id for new hashes; legacy bcrypt hashes still verify and get upgraded on
+# the next successful login. Both libraries are called directly (no passlib).
+_argon2 = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+# Verified tokens, keyed by sha256(token) so raw tokens are never kept in memory.
+# Values are (user_id, exp) so an entry is never honoured past the token's expiry.
+_token_cache = TTLCache(maxsize=JWT_CACHE_MAX, ttl=max(JWT_CACHE_TTL, 1))
+_token_cache_lock = threading.Lock()
+
+# User ids known to exist, so authenticated requests can skip the users lookup.
+_user_exists_cache = TTLCache(maxsize=USER_CACHE_MAX, ttl=max(USER_CACHE_TTL, 1))
+_user_exists_lock = threading.Lock()
+
+# Password hashing is CPU-bound; it runs on a dedicated, bounded thread pool
+# (argon2-cffi and bcrypt release the GIL) so it never ties up the event loop or
+# the request threadpool. Created and shut down by the app lifespan.
+_hash_pool: Optional[ThreadPoolExecutor] = None
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
 
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
     echo=False,
+    **(
+        {"connect_args": {"check_same_thread": False}}
+        if IS_SQLITE
+        else {"pool_size": 20, "max_overflow": 10, "pool_pre_ping": True}
+    ),
+)
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA foreign_keys=ON",
 )
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cur.execute(pragma)
+        cur.close()
 Base = declarative_base()
 
 # -----------------------
@@ -71,10 +133,56 @@ class Transaction(Base):
     category: Mapped[Optional[Category]] = relationship(back_populates="transactions")
     owner: Mapped[User] = relationship(back_populates="transactions")
 
+    # Cover the list_transactions access pattern: filter by owner, order by date desc.
+    __table_args__ = (
+        Index("ix_tx_owner_date", "owner_id", date.desc()),
+        Index("ix_tx_owner_type_date", "owner_id", "type", date.desc()),
+        Index("ix_tx_owner_cat", "owner_id", "category_id"),
+    )
+
 
 Base.metadata.create_all(engine)
+# create_all skips indexes on tables that already exist; add any newer ones.
+for ix in Transaction.__table__.indexes:
+    ix.create(engine, checkfirst=True)
+
+# Full-text index over transaction descriptions (SQLite FTS5, external content
+# kept in sync by triggers). Other backends fall back to ILIKE.
+SQLITE_FTS_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS tx_fts USING fts5(
+        description, content='transactions', content_rowid='id', tokenize='unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS tx_fts_ai AFTER INSERT ON transactions BEGIN
+        INSERT INTO tx_fts(rowid, description) VALUES (new.id, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tx_fts_ad AFTER DELETE ON transactions BEGIN
+        INSERT INTO tx_fts(tx_fts, rowid, description) VALUES ('delete', old.id, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tx_fts_au AFTER UPDATE OF description ON transactions BEGIN
+        INSERT INTO tx_fts(tx_fts, rowid, description) VALUES ('delete', old.id, old.description);
+        INSERT INTO tx_fts(rowid, description) VALUES (new.id, new.description);
+    END""",
+)
+
+if IS_SQLITE:
+    # Every statement is idempotent, so concurrent workers starting on a fresh DB
+    # can't trip over each other.
+    with engine.begin() as conn:
+        created = conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'tx_fts'").first() is None
+        for ddl in SQLITE_FTS_DDL:
+            conn.exec_driver_sql(ddl)
+        if created:
+            # index rows that predate the FTS table (harmless if repeated)
+            conn.exec_driver_sql("INSERT INTO tx_fts(tx_fts) VALUES ('rebuild')")
+
+def fts_match_query(q: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 query: every word becomes a quoted prefix term."""
+    words = re.findall(r"\w+", q)
+    return " ".join(f'"{w}"*' for w in words) or None
 
-# -------------------
+# -----------------------
+# Schemas
+# -----------------------
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -132,40 +240,116 @@ class ReportItem(BaseModel):
 # -----------------------
 # Auth utils
 # -----------------------
-def hash_password(pw: str) -> str:
-    return pwd_context.hash(pw)
-
-def verify_password(pw: str, pw_hash: str) -> bool:
-    return pwd_context.verify(pw, pw_hash)
+def _hash_password_sync(pw: str) -> str:
+    return _argon2.hash(pw)
+
+def _verify_password_sync(pw: str, pw_hash: str) -> bool:
+    if pw_hash.startswith("$argon2"):
+        try:
+            return _argon2.verify(pw_hash, pw)
+        except (VerificationError, InvalidHashError):
+            return False
+    if pw_hash.startswith("$2"):
+        try:
+            return bcrypt.checkpw(pw.encode("utf-8"), pw_hash.encode("ascii"))
+        except ValueError:  # malformed/truncated hash (or non-ASCII junk)
+            return False
+    return False
+
+def _verify_and_update_sync(pw: str, pw_hash: str) -> tuple[bool, Optional[str]]:
+    if not _verify_password_sync(pw, pw_hash):
+        return False, None
+    if pw_hash.startswith("$argon2") and not _argon2.check_needs_rehash(pw_hash):
+        return True, None
+    return True, _argon2.hash(pw)
+
+async def _run_hash(fn, *args):
+    if _hash_pool is None:
+        raise RuntimeError("Hash pool not started; run the app with its lifespan")
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+
+async def hash_password(pw: str) -> str:
+    return await _run_hash(_hash_password_sync, pw)
+
+async def verify_and_update_password(pw: str, pw_hash: str) -> tuple[bool, Optional[str]]:
+    """Verify pw; also return a fresh hash if pw_hash uses a deprecated scheme."""
+    return await _run_hash(_verify_and_update_sync, pw, pw_hash)
 
 def create_access_token(data: dict, expires_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES) -> str:
     to_encode = data.copy()
     expire = dt.datetime.utcnow() + dt.timedelta(minutes=expires_minutes)
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm="HS256")
+    return _jwt.encode(to_encode, _SECRET_BYTES, algorithm="HS256")
 
 def get_db():
-    with Session(engine) as session:
+    # Objects stay loaded after commit, so handlers can return what they just
+    # wrote without a refresh SELECT.
+    with Session(engine, expire_on_commit=False) as session:
         yield session
 
-def get_user_from_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def decode_token_uid(token: str) -> int:
+    if not token or len(token) > MAX_TOKEN_LENGTH or token.count(".") != 2:
+        raise jwt.InvalidTokenError("Malformed token")
+    key = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+    with _token_cache_lock:
+        cached = _token_cache.get(key)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    payload = _jwt.decode(token, _SECRET_BYTES, algorithms=JWT_ALGORITHMS)
+    uid = int(payload.get("sub"))
+    exp = float(payload.get("exp", now))
+    if JWT_CACHE_TTL > 0 and exp > now:
+        with _token_cache_lock:
+            _token_cache[key] = (uid, exp)
+    return uid
+
+def get_uid_from_token(token: str = Depends(oauth2_scheme)) -> int:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        uid: int = int(payload.get("sub"))
+        uid: int = decode_token_uid(token)
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+    return uid
+
+def get_user_from_token(uid: int = Depends(get_uid_from_token), db: Session = Depends(get_db)) -> User:
+    """Return a detached User carrying only ``id``; use FullUserDep for the full row."""
+    with _user_exists_lock:
+        known = uid in _user_exists_cache
+    if not known:
+        if db.scalar(select(User.id).where(User.id == uid)) is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        if USER_CACHE_TTL > 0:
+            with _user_exists_lock:
+                _user_exists_cache[uid] = True
+    return User(id=uid)
+
+def get_full_user_from_token(uid: int = Depends(get_uid_from_token), db: Session = Depends(get_db)) -> User:
     user = db.get(User, uid)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
+# WARNING: UserDep yields a detached User with only ``.id`` populated; other
+# columns read as None and relationships as empty. Use FullUserDep for the row.
 UserDep = Annotated[User, Depends(get_user_from_token)]
+FullUserDep = Annotated[User, Depends(get_full_user_from_token)]
 
 # -----------------------
 # App
 # -----------------------
-app = FastAPI(title="Expense Tracker API", version="1.0")
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    global _hash_pool
+    _hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="pwhash")
+    try:
+        yield
+    finally:
+        _hash_pool.shutdown(wait=True)
+        _hash_pool = None
+
+app = FastAPI(title="Expense Tracker API", version="1.0", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -178,59 +362,68 @@ app.add_middleware(
 # -----------------------
 # Auth routes
 # -----------------------
-@app.post("/auth/register", response_model=UserOut, status_code=201)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    exists = db.scalar(select(User).where(User.email == user.email))
-    if exists:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    u = User(email=user.email, password_hash=hash_password(user.password))
+# These routes are async so they can await the hash pool; their (sync) DB work
+# goes through run_in_threadpool to keep it off the event loop.
+def _create_user(db: Session, email: str, pw_hash: str) -> User:
+    u = User(email=email, password_hash=pw_hash)
     db.add(u)
-    db.commit()
-    db.refresh(u)
-    # Create 3 default categories to get started
-    for name in ["General", "Food", "Transport"]:
-        db.add(Category(name=name, owner_id=u.id))
+    db.flush()  # assigns u.id; user + default categories commit together
+    # Create 3 default categories to get started (one bulk INSERT)
+    db.execute(insert(Category), [{"name": name, "owner_id": u.id} for name in ("General", "Food", "Transport")])
     db.commit()
     return u
 
+@app.post("/auth/register", response_model=UserOut, status_code=201)
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    exists = await run_in_threadpool(db.scalar, select(User.id).where(User.email == user.email))
+    if exists is not None:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    pw_hash = await hash_password(user.password)
+    return await run_in_threadpool(_create_user, db, user.email, pw_hash)
+
 @app.post("/auth/login", response_model=Token)
-def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    u = db.scalar(select(User).where(User.email == form.username))
-    if not u or not verify_password(form.password, u.password_hash):
+async def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    u = await run_in_threadpool(db.scalar, select(User).where(User.email == form.username))
+    if not u:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+    ok, new_hash = await verify_and_update_password(form.password, u.password_hash)
+    if not ok:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    if new_hash:
+        u.password_hash = new_hash
+        await run_in_threadpool(db.commit)
     token = create_access_token({"sub": str(u.id)})
     return Token(access_token=token)
 
 # -----------------------
 # Category routes
 # -----------------------
-@app.get("/categories", response_model=List[CategoryOut])
+# Trusted DB rows are dumped by orjson directly; CategoryOut only documents the shape.
+@app.get("/categories", response_model=None, responses={200: {"model": List[CategoryOut]}})
 def list_categories(current_user: UserDep, db: Session = Depends(get_db)):
-    cats = db.scalars(select(Category).where(Category.owner_id == current_user.id).order_by(Category.name)).all()
-    return cats
+    stmt = select(Category.id, Category.name).where(Category.owner_id == current_user.id).order_by(Category.name)
+    return ORJSONResponse([dict(row) for row in db.execute(stmt).mappings()])
 
 @app.post("/categories", response_model=CategoryOut, status_code=201)
 def create_category(payload: CategoryIn, current_user: UserDep, db: Session = Depends(get_db)):
     c = Category(name=payload.name, owner_id=current_user.id)
     db.add(c)
     db.commit()
-    db.refresh(c)
     return c
 
 @app.put("/categories/{category_id}", response_model=CategoryOut)
 def update_category(category_id: int, payload: CategoryIn, current_user: UserDep, db: Session = Depends(get_db)):
-    c = db.get(Category, category_id)
-    if not c or c.owner_id != current_user.id:
+    c = db.scalar(select(Category).where(Category.id == category_id, Category.owner_id == current_user.id))
+    if not c:
         raise HTTPException(status_code=404, detail="Category not found")
     c.name = payload.name
     db.commit()
-    db.refresh(c)
     return c
 
 @app.delete("/categories/{category_id}", status_code=204)
 def delete_category(category_id: int, current_user: UserDep, db: Session = Depends(get_db)):
-    c = db.get(Category, category_id)
-    if not c or c.owner_id != current_user.id:
+    c = db.scalar(select(Category).where(Category.id == category_id, Category.owner_id == current_user.id))
+    if not c:
         raise HTTPException(status_code=404, detail="Category not found")
     db.delete(c)
     db.commit()
@@ -239,7 +432,15 @@ def delete_category(category_id: int, current_user: UserDep, db: Session = Depen
 # -----------------------
 # Transaction routes
 # -----------------------
-@app.get("/transactions", response_model=List[TxOut])
+def _tx_to_out(tx: Transaction, category_name: Optional[str]) -> TxOut:
+    # category_name comes from the caller's ownership check, never tx.category (lazy load)
+    return TxOut(
+        id=tx.id, date=tx.date, description=tx.description, amount=tx.amount,
+        type=tx.type, category_id=tx.category_id, category_name=category_name
+    )
+
+# Rows are built straight into dicts and dumped by orjson; TxOut only documents the shape.
+@app.get("/transactions", response_model=None, responses={200: {"model": List[TxOut]}})
 def list_transactions(
     current_user: UserDep,
     db: Session = Depends(get_db),
@@ -251,33 +452,49 @@ def list_transactions(
     limit: int = 50,
     offset: int = 0,
 ):
-    stmt = select(Transaction).where(Transaction.owner_id == current_user.id)
+    # Plain columns rather than ORM entities: rows go straight to orjson with no
+    # per-row instance hydration or attribute access. Built as a lambda_stmt so
+    # each filter shape is constructed and compiled once, then cached; closure
+    # values (uid, dates, limit...) become bound parameters.
+    uid = current_user.id
+    params = {}
+    stmt = lambda_stmt(lambda: (
+        select(
+            Transaction.id, Transaction.date, Transaction.description, Transaction.amount,
+            Transaction.type, Transaction.category_id, Category.name.label("category_name"),
+        )
+        .outerjoin(Category, Transaction.category_id == Category.id)
+        .where(Transaction.owner_id == uid)
+    ))
     if q:
-        stmt = stmt.where(Transaction.description.ilike(f"%{q}%"))
+        match = fts_match_query(q) if IS_SQLITE else None
+        if match:
+            params["fts_q"] = match
+            stmt += lambda s: s.where(Transaction.id.in_(
+                select(literal_column("rowid")).select_from(text("tx_fts")).where(text("tx_fts MATCH :fts_q"))
+            ))
+        else:
+            pattern = f"%{q}%"
+            stmt += lambda s: s.where(Transaction.description.ilike(pattern))
     if type in ("expense", "income"):
-        stmt = stmt.where(Transaction.type == type)
+        stmt += lambda s: s.where(Transaction.type == type)
     if category_id:
-        stmt = stmt.where(Transaction.category_id == category_id)
+        stmt += lambda s: s.where(Transaction.category_id == category_id)
     if start:
-        stmt = stmt.where(Transaction.date >= start)
+        stmt += lambda s: s.where(Transaction.date >= start)
     if end:
-        stmt = stmt.where(Transaction.date <= end)
-    stmt = stmt.order_by(Transaction.date.desc()).limit(limit).offset(offset)
-    txs = db.scalars(stmt).all()
-    out = []
-    for t in txs:
-        out.append(TxOut(
-            id=t.id, date=t.date, description=t.description, amount=t.amount,
-            type=t.type, category_id=t.category_id,
-            category_name=(t.category.name if t.category else None)
-        ))
-    return out
+        stmt += lambda s: s.where(Transaction.date <= end)
+    stmt += lambda s: s.order_by(Transaction.date.desc()).limit(limit).offset(offset)
+    return ORJSONResponse([dict(row) for row in db.execute(stmt, params).mappings()])
 
 @app.post("/transactions", response_model=TxOut, status_code=201)
 def create_transaction(payload: TxIn, current_user: UserDep, db: Session = Depends(get_db)):
-    if payload.category_id:
-        cat = db.get(Category, payload.category_id)
-        if not cat or cat.owner_id != current_user.id:
+    cat_name = None
+    if payload.category_id is not None:
+        cat_name = db.scalar(
+            select(Category.name).where(Category.id == payload.category_id, Category.owner_id == current_user.id)
+        )
+        if cat_name is None:
             raise HTTPException(status_code=404, detail="Category not found")
     tx = Transaction(
         date=payload.date,
@@ -289,21 +506,19 @@ def create_transaction(payload: TxIn, current_user: UserDep, db: Session = Depen
     )
     db.add(tx)
     db.commit()
-    db.refresh(tx)
-    return TxOut(
-        id=tx.id, date=tx.date, description=tx.description, amount=tx.amount,
-        type=tx.type, category_id=tx.category_id,
-        category_name=(tx.category.name if tx.category else None)
-    )
+    return _tx_to_out(tx, cat_name)
 
 @app.put("/transactions/{tx_id}", response_model=TxOut)
 def update_transaction(tx_id: int, payload: TxIn, current_user: UserDep, db: Session = Depends(get_db)):
-    tx = db.get(Transaction, tx_id)
-    if not tx or tx.owner_id != current_user.id:
+    tx = db.scalar(select(Transaction).where(Transaction.id == tx_id, Transaction.owner_id == current_user.id))
+    if not tx:
         raise HTTPException(status_code=404, detail="Transaction not found")
-    if payload.category_id:
-        cat = db.get(Category, payload.category_id)
-        if not cat or cat.owner_id != current_user.id:
+    cat_name = None
+    if payload.category_id is not None:
+        cat_name = db.scalar(
+            select(Category.name).where(Category.id == payload.category_id, Category.owner_id == current_user.id)
+        )
+        if cat_name is None:
             raise HTTPException(status_code=404, detail="Category not found")
     tx.date = payload.date
     tx.description = payload.description
@@ -311,251 +526,32 @@ def update_transaction(tx_id: int, payload: TxIn, current_user: UserDep, db: Ses
     tx.type = payload.type
     tx.category_id = payload.category_id
     db.commit()
-    db.refresh(tx)
-    return TxOut(
-        id=tx.id, date=tx.date, description=tx.description, amount=tx.amount,
-        type=tx.type, category_id=tx.category_id,
-        category_name=(tx.category.name if tx.category else None)
-    )
-class Token(BaseModel):
-    access_token: str
-    token_type: str = "bearer"
-
-
-class UserCreate(BaseModel):
-    email: str
-    password: str
-
-
-class UserOut(BaseModel):
-    id: int
-    email: str
-    class Config:
-        from_attributes = True
-
-
-class CategoryIn(BaseModel):
-    name: str = Field(min_length=1, max_length=100)
-
-
-class CategoryOut(BaseModel):
-    id: int
-    name: str
-    class Config:
-        from_attributes = True
-
-
-class TxIn(BaseModel):
-    date: dt.date
-    description: str
-    amount: float = Field(gt=0)
-    type: str = Field(pattern="^(expense|income)$")
-    category_id: Optional[int] = None
-
-
-class TxOut(BaseModel):
-    id: int
-    date: dt.date
-    description: str
-    amount: float
-    type: str
-    category_id: Optional[int]
-    category_name: Optional[str] = None
-    class Config:
-        from_attributes = True
-
-
-class ReportItem(BaseModel):
-    category_name: Optional[str]
-    total_expense: float
-    total_income: float
-
+    return _tx_to_out(tx, cat_name)
 
 # -----------------------
-# Auth utils
+# Report routes
 # -----------------------
-def hash_password(pw: str) -> str:
-    return pwd_context.hash(pw)
-
-def verify_password(pw: str, pw_hash: str) -> bool:
-    return pwd_context.verify(pw, pw_hash)
-
-def create_access_token(data: dict, expires_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES) -> str:
-    to_encode = data.copy()
-    expire = dt.datetime.utcnow() + dt.timedelta(minutes=expires_minutes)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm="HS256")
-
-def get_db():
-    with Session(engine) as session:
-        yield session
-
-def get_user_from_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        uid: int = int(payload.get("sub"))
-    except Exception:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-
-    user = db.get(User, uid)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return user
-
-UserDep = Annotated[User, Depends(get_user_from_token)]
-
-# -----------------------
-# App
-# -----------------------
-app = FastAPI(title="Expense Tracker API", version="1.0")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # tighten in prod
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# -----------------------
-# Auth routes
-# -----------------------
-@app.post("/auth/register", response_model=UserOut, status_code=201)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    exists = db.scalar(select(User).where(User.email == user.email))
-    if exists:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    u = User(email=user.email, password_hash=hash_password(user.password))
-    db.add(u)
-    db.commit()
-    db.refresh(u)
-    # Create 3 default categories to get started
-    for name in ["General", "Food", "Transport"]:
-        db.add(Category(name=name, owner_id=u.id))
-    db.commit()
-    return u
-
-@app.post("/auth/login", response_model=Token)
-def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    u = db.scalar(select(User).where(User.email == form.username))
-    if not u or not verify_password(form.password, u.password_hash):
-        raise HTTPException(status_code=400, detail="Incorrect email or password")
-    token = create_access_token({"sub": str(u.id)})
-    return Token(access_token=token)
-
-# -----------------------
-# Category routes
-# -----------------------
-@app.get("/categories", response_model=List[CategoryOut])
-def list_categories(current_user: UserDep, db: Session = Depends(get_db)):
-    cats = db.scalars(select(Category).where(Category.owner_id == current_user.id).order_by(Category.name)).all()
-    return cats
-
-@app.post("/categories", response_model=CategoryOut, status_code=201)
-def create_category(payload: CategoryIn, current_user: UserDep, db: Session = Depends(get_db)):
-    c = Category(name=payload.name, owner_id=current_user.id)
-    db.add(c)
-    db.commit()
-    db.refresh(c)
-    return c
-
-@app.put("/categories/{category_id}", response_model=CategoryOut)
-def update_category(category_id: int, payload: CategoryIn, current_user: UserDep, db: Session = Depends(get_db)):
-    c = db.get(Category, category_id)
-    if not c or c.owner_id != current_user.id:
-        raise HTTPException(status_code=404, detail="Category not found")
-    c.name = payload.name
-    db.commit()
-    db.refresh(c)
-    return c
-
-@app.delete("/categories/{category_id}", status_code=204)
-def delete_category(category_id: int, current_user: UserDep, db: Session = Depends(get_db)):
-    c = db.get(Category, category_id)
-    if not c or c.owner_id != current_user.id:
-        raise HTTPException(status_code=404, detail="Category not found")
-    db.delete(c)
-    db.commit()
-    return Response(status_code=204)
-
-# -----------------------
-# Transaction routes
-# -----------------------
-@app.get("/transactions", response_model=List[TxOut])
-def list_transactions(
+@app.get("/reports/by_category", response_model=None, responses={200: {"model": List[ReportItem]}})
+def report_by_category(
     current_user: UserDep,
     db: Session = Depends(get_db),
-    q: Optional[str] = None,
-    type: Optional[str] = None,
-    category_id: Optional[int] = None,
     start: Optional[dt.date] = None,
     end: Optional[dt.date] = None,
-    limit: int = 50,
-    offset: int = 0,
 ):
-    stmt = select(Transaction).where(Transaction.owner_id == current_user.id)
-    if q:
-        stmt = stmt.where(Transaction.description.ilike(f"%{q}%"))
-    if type in ("expense", "income"):
-        stmt = stmt.where(Transaction.type == type)
-    if category_id:
-        stmt = stmt.where(Transaction.category_id == category_id)
+    # Aggregate in SQL: one row per category regardless of transaction count.
+    stmt = (
+        select(
+            Category.name.label("category_name"),
+            func.coalesce(func.sum(case((Transaction.type == "expense", Transaction.amount), else_=0.0)), 0.0).label("total_expense"),
+            func.coalesce(func.sum(case((Transaction.type == "income", Transaction.amount), else_=0.0)), 0.0).label("total_income"),
+        )
+        .select_from(Transaction)
+        .outerjoin(Category, Transaction.category_id == Category.id)
+        .where(Transaction.owner_id == current_user.id)
+    )
     if start:
         stmt = stmt.where(Transaction.date >= start)
     if end:
         stmt = stmt.where(Transaction.date <= end)
-    stmt = stmt.order_by(Transaction.date.desc()).limit(limit).offset(offset)
-    txs = db.scalars(stmt).all()
-    out = []
-    for t in txs:
-        out.append(TxOut(
-            id=t.id, date=t.date, description=t.description, amount=t.amount,
-            type=t.type, category_id=t.category_id,
-            category_name=(t.category.name if t.category else None)
-        ))
-    return out
-
-@app.post("/transactions", response_model=TxOut, status_code=201)
-def create_transaction(payload: TxIn, current_user: UserDep, db: Session = Depends(get_db)):
-    if payload.category_id:
-        cat = db.get(Category, payload.category_id)
-        if not cat or cat.owner_id != current_user.id:
-            raise HTTPException(status_code=404, detail="Category not found")
-    tx = Transaction(
-        date=payload.date,
-        description=payload.description,
-        amount=payload.amount,
-        type=payload.type,
-        category_id=payload.category_id,
-        owner_id=current_user.id,
-    )
-    db.add(tx)
-    db.commit()
-    db.refresh(tx)
-    return TxOut(
-        id=tx.id, date=tx.date, description=tx.description, amount=tx.amount,
-        type=tx.type, category_id=tx.category_id,
-        category_name=(tx.category.name if tx.category else None)
-    )
-
-@app.put("/transactions/{tx_id}", response_model=TxOut)
-def update_transaction(tx_id: int, payload: TxIn, current_user: UserDep, db: Session = Depends(get_db)):
-    tx = db.get(Transaction, tx_id)
-    if not tx or tx.owner_id != current_user.id:
-        raise HTTPException(status_code=404, detail="Transaction not found")
-    if payload.category_id:
-        cat = db.get(Category, payload.category_id)
-        if not cat or cat.owner_id != current_user.id:
-            raise HTTPException(status_code=404, detail="Category not found")
-    tx.date = payload.date
-    tx.description = payload.description
-    tx.amount = payload.amount
-    tx.type = payload.type
-    tx.category_id = payload.category_id
-    db.commit()
-    db.refresh(tx)
-    return TxOut(
-        id=tx.id, date=tx.date, description=tx.description, amount=tx.amount,
-        type=tx.type, category_id=tx.category_id,
-        category_name=(tx.category.name if tx.category else None)
-    )
\ No newline at end of file
+    stmt = stmt.group_by(Category.name).order_by(Category.name)
+    return ORJSONResponse([dict(row) for row in db.execute(stmt).mappings()])